@@ -0,0 +1,132 @@
+"""Benchmark memori (RSS) untuk operasi jangka panjang server_automation.py.
+
+Menulis 24 jam snapshot sintetis untuk banyak host ke file JSONL dengan format
+yang sama seperti hasil `record`, lalu membacanya lewat load_replay_samples dan
+jalur replay (analisis dengan model pengganti, keputusan remediasi dry-run,
+format notifikasi). RSS dicatat setiap jam simulasi, diukur sejak jam 0. File
+rekaman nyata bisa dipakai dengan --snapshots.
+
+Nilai sintetis dikuantisasi agar kunci cache analisis berulang, sehingga jalur
+cache miss (analisis baru) maupun cache hit (Analysis yang dipakai ulang) ikut
+terukur. Pertumbuhan selama pemanasan (cache terisi, sekitar 3 jam simulasi
+untuk 1000 host) dibatasi oleh REPLAY_CACHE_SIZE.
+
+Penggunaan:
+    python benchmarks/bench_memory.py [--hosts 1000] [--hours 24] [--interval 900] [--snapshots FILE.jsonl]
+                                      [--warmup-hours 3] [--max-growth-mb 10] [--max-steady-growth-mb 1]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import server_automation as sa  # noqa: E402
+
+
+def current_rss_mb():
+    """RSS proses saat ini (MB) dari /proc/self/statm"""
+    with open("/proc/self/statm", "r") as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def write_snapshots(path, hosts, hours, interval, seed=42):
+    """Menulis snapshot sintetis berurutan waktu ke JSONL dengan format hasil `record`"""
+    rng = random.Random(seed)
+    start = 1_700_000_000
+    host_names = [f"host-{i:04d}:9100" for i in range(hosts)]
+    cycles_per_hour = max(1, 3600 // interval)
+
+    with open(path, "w") as f:
+        for cycle in range(hours * cycles_per_hour):
+            timestamp = start + cycle * interval
+            for i, host in enumerate(host_names):
+                phase = cycle / cycles_per_hour + i
+                # Nilai dikuantisasi (tingkat diskrit) agar snapshot yang mirip menghasilkan kunci cache sama
+                snapshot = {
+                    "cpu_usage": min(100.0, round(55 + 40 * math.sin(phase) + rng.uniform(-5, 5), -1)),
+                    "memory_usage": min(100.0, round(70 + 25 * math.sin(phase / 3) + rng.uniform(-5, 5), -1)),
+                    "disk_usage": min(100.0, round(80 + 15 * math.sin(phase / 7) + rng.uniform(-2, 2), -1)),
+                    "load_avg": float(rng.randint(0, 8)),
+                    "network_receive": rng.choice((1e5, 1e6, 5e6)),
+                    "network_transmit": rng.choice((1e5, 1e6, 5e6)),
+                    "timestamp": timestamp,
+                    "instance": host
+                }
+                f.write(json.dumps(snapshot, separators=(",", ":")) + "\n")
+
+
+def with_hourly_rss(samples, rss_log):
+    """Meneruskan sampel dari loader dan mencatat RSS setiap pergantian jam simulasi"""
+    next_hour = None
+    for sample in samples:
+        if next_hour is None or sample.timestamp >= next_hour:
+            rss_log.append(current_rss_mb())
+            next_hour = (sample.timestamp // 3600 + 1) * 3600
+        yield sample
+    rss_log.append(current_rss_mb())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1000, help="Jumlah host yang disimulasikan")
+    parser.add_argument("--hours", type=int, default=24, help="Durasi simulasi (jam)")
+    parser.add_argument("--interval", type=int, default=900, help="Interval siklus per host (detik)")
+    parser.add_argument("--snapshots", help="Pakai file JSONL yang sudah ada (misalnya hasil `record`)")
+    parser.add_argument("--cache-precision", type=int, default=0, help="Presisi kunci cache analisis replay")
+    parser.add_argument("--max-growth-mb", type=float, default=10.0,
+                        help="Gagal (exit 1) jika RSS naik lebih dari nilai ini sejak jam 0 (termasuk pemanasan)")
+    parser.add_argument("--warmup-hours", type=int, default=3,
+                        help="Jam simulasi untuk mengisi cache analisis sebelum RSS harus datar")
+    parser.add_argument("--max-steady-growth-mb", type=float, default=1.0,
+                        help="Gagal (exit 1) jika RSS naik lebih dari nilai ini setelah pemanasan")
+    args = parser.parse_args()
+
+    path = args.snapshots
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        write_snapshots(path, args.hosts, args.hours, args.interval)
+
+    rss_log = []
+    try:
+        samples = with_hourly_rss(sa.load_replay_samples(path), rss_log)
+        counts = sa.replay(samples, {"cache_precision": args.cache_precision})
+    finally:
+        if args.snapshots is None:
+            os.remove(path)
+
+    for hour, rss in enumerate(rss_log):
+        print(f"jam {hour:2d}: RSS {rss:7.1f} MB")
+    print(f"{counts['cycles']} siklus, {counts['llm_calls']} panggilan LLM, {counts['cache_hits']} cache hit, "
+          f"{counts['alerts']} alert, {counts['elapsed']} detik")
+
+    # Pemanasan mengisi cache analisis hingga REPLAY_CACHE_SIZE entri; setelahnya RSS harus datar
+    warmup = min(args.warmup_hours, len(rss_log) - 1)
+    growth = max(rss_log) - rss_log[0]
+    steady_growth = max(rss_log[warmup:]) - rss_log[warmup]
+    print(f"pertumbuhan RSS sejak jam 0: {growth:.1f} MB (pemanasan {warmup} jam: "
+          f"{rss_log[warmup] - rss_log[0]:.1f} MB, REPLAY_CACHE_SIZE={sa.REPLAY_CACHE_SIZE})")
+    print(f"pertumbuhan RSS setelah pemanasan: {steady_growth:.1f} MB")
+
+    failed = False
+    if counts["cache_hits"] == 0 or counts["llm_calls"] == 0:
+        print("GAGAL: jalur cache hit dan cache miss harus sama-sama terukur")
+        failed = True
+    if growth > args.max_growth_mb:
+        print(f"GAGAL: RSS naik lebih dari {args.max_growth_mb} MB sejak jam 0")
+        failed = True
+    if steady_growth > args.max_steady_growth_mb:
+        print(f"GAGAL: RSS naik lebih dari {args.max_steady_growth_mb} MB setelah pemanasan")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
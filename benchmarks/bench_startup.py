@@ -0,0 +1,79 @@
+"""Benchmark waktu startup (cold start) server_automation.py.
+
+Mengukur waktu import modul dan waktu `--help` setiap subcommand di proses
+Python baru, serta memastikan dependensi berat tidak ikut dimuat saat import.
+
+Penggunaan:
+    python benchmarks/bench_startup.py [--runs 10] [--max-ms 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "server_automation.py")
+HEAVY_MODULES = ["google.generativeai", "ansible_runner", "yaml", "requests"]
+
+IMPORT_PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import server_automation\n"
+    "elapsed = (time.perf_counter() - t) * 1000\n"
+    "print(json.dumps({'import_ms': elapsed, 'heavy': [m for m in %r if m in sys.modules]}))\n"
+) % HEAVY_MODULES
+
+
+def run_import_probe():
+    """Menjalankan import di interpreter baru dan mengembalikan waktu import serta modul berat"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_command(argv):
+    """Mengukur waktu wall-clock menjalankan perintah di proses baru (ms)"""
+    started = time.perf_counter()
+    subprocess.run(argv, cwd=ROOT, capture_output=True, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Jumlah pengulangan per pengukuran")
+    parser.add_argument("--max-ms", type=float, help="Gagal (exit 1) jika median import melebihi nilai ini")
+    args = parser.parse_args()
+
+    import_ms = []
+    heavy = set()
+    for _ in range(args.runs):
+        probe = run_import_probe()
+        import_ms.append(probe["import_ms"])
+        heavy.update(probe["heavy"])
+
+    interpreter_ms = statistics.median(time_command([sys.executable, "-c", "pass"]) for _ in range(args.runs))
+    print(f"interpreter kosong        : {interpreter_ms:7.1f} ms (median)")
+    print(f"import server_automation  : {statistics.median(import_ms):7.1f} ms (median, max {max(import_ms):.1f})")
+
+    for command in [[], ["collect"], ["analyze"], ["remediate"], ["summary"]]:
+        argv = [sys.executable, SCRIPT] + command + ["--help"]
+        elapsed = statistics.median(time_command(argv) for _ in range(args.runs))
+        label = " ".join(command) or "(tanpa subcommand)"
+        print(f"{label + ' --help':<26}: {elapsed:7.1f} ms (median)")
+
+    if heavy:
+        print(f"GAGAL: dependensi berat dimuat saat import: {sorted(heavy)}")
+        return 1
+    if args.max_ms is not None and statistics.median(import_ms) > args.max_ms:
+        print(f"GAGAL: median import melebihi {args.max_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,16 @@
-import google.generativeai as genai
 import json
-import yaml
-import requests
 import logging
 import time
 import os
-import ansible_runner
-from datetime import datetime
+import sys
+import math
+import argparse
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+
+# Dependensi berat (google.generativeai, ansible_runner, yaml, requests) dimuat
+# saat pertama kali dipakai agar setiap subcommand cron hanya memuat yang diperlukan
 
 # Setup logging
 logging.basicConfig(
@@ -19,25 +23,212 @@ logging.basicConfig(
 GEMINI_API_KEY = "<APIKEY-GEMINI>"  # Ganti dengan API key Anda
 PROMETHEUS_URL = "http://localhost:9090"  # Sesuaikan dengan alamat Prometheus Anda
 
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
+# Agregat berjalan untuk ringkasan harian
+STATS_FILE = "reports/daily_stats.json"
+STATS_WINDOW_HOURS = 24  # Jendela statistik (slot per jam)
+STATS_HIST_RATIO = 1.05  # Lebar bucket histogram (±5%) untuk estimasi p95
+
+# Verifikasi setelah tindakan remediasi
+VERIFY_TIMEOUT = 120  # Batas total waktu menunggu pemulihan per siklus (detik)
+VERIFY_INTERVAL = 5  # Jeda antar pengecekan (detik)
+RECOVERY_THRESHOLDS = {  # Komponen dianggap pulih jika metrik di bawah ambang ini
+    "cpu": ("cpu_usage", 80.0),
+    "memory": ("memory_usage", 85.0),
+    "disk": ("disk_usage", 85.0)
+}
+REMEDIATION_HISTORY_FILE = "reports/remediation_history.json"
+REMEDIATION_MIN_ATTEMPTS = 5  # Minimal percobaan sebelum riwayat dipakai untuk keputusan
+REMEDIATION_MIN_SUCCESS_RATE = 0.2  # Tindakan di bawah rasio ini diganti eskalasi ke admin
+REMEDIATION_WINDOW = 20  # Hanya N hasil terakhir per tindakan+target yang dihitung
+REMEDIATION_PROBE_EVERY = 12  # Setelah dilewati N kali, tindakan dicoba lagi agar skornya bisa pulih
+
+# Replay riwayat metrik
+REPLAY_CACHE_SIZE = 4096  # Maksimal entri cache analisis per konfigurasi replay
+REPLAY_RECENT_DECISIONS = 100  # Maksimal keputusan terakhir yang disimpan di laporan replay
+REPLAY_JSON_MAX_BYTES = 16 * 1024 * 1024  # Snapshot .json dimuat utuh, jadi ukurannya dibatasi (pakai .jsonl)
+RECORD_CHUNK_POINTS = 60  # Jumlah titik waktu per query_range saat `record` (membatasi memori)
+
+# Batas memori dan log
+LOG_MAX_CHARS = 500  # Potong nilai panjang (playbook, hasil tindakan) sebelum ditulis ke log
+ANALYSIS_STATUSES = ("healthy", "warning", "critical", "unknown", "error")  # Status lain dianggap "unknown"
+
+# Query Prometheus untuk setiap metrik
+PROMETHEUS_QUERIES = {
+    "cpu_usage": "100 - (avg by(instance) (irate(node_cpu_seconds_total{mode='idle'}[5m])) * 100)",
+    "memory_usage": "100 * (1 - ((node_memory_MemFree_bytes + node_memory_Cached_bytes + node_memory_Buffers_bytes) / node_memory_MemTotal_bytes))",
+    "disk_usage": "100 - ((node_filesystem_avail_bytes{mountpoint='/'} * 100) / node_filesystem_size_bytes{mountpoint='/'})",
+    "load_avg": "node_load1",
+    "network_receive": "irate(node_network_receive_bytes_total{device!='lo'}[5m])",
+    "network_transmit": "irate(node_network_transmit_bytes_total{device!='lo'}[5m])"
+}
+
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+
+_gemini_model = None
+
+def get_gemini_model():
+    """Memuat dan mengkonfigurasi model Gemini saat pertama kali dibutuhkan"""
+    global _gemini_model
+    if _gemini_model is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return _gemini_model
+
+METRIC_NAMES = tuple(PROMETHEUS_QUERIES)
+_METRIC_INDEX = {name: i for i, name in enumerate(METRIC_NAMES)}
+
+def _truncate_for_log(value, limit=None):
+    """Memotong representasi nilai agar baris log tetap kecil"""
+    limit = LOG_MAX_CHARS if limit is None else limit
+    text = str(value)
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} karakter)"
+
+def normalize_status(status):
+    """Status di luar ANALYSIS_STATUSES dianggap "unknown" agar penghitung tidak menambah kunci baru"""
+    return status if status in ANALYSIS_STATUSES else "unknown"
+
+def _parse_timestamp(value):
+    """Mengubah timestamp snapshot (epoch angka/string atau ISO 8601, termasuk akhiran Z) menjadi epoch"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            # datetime.fromisoformat sebelum Python 3.11 tidak menerima akhiran "Z"
+            if value.endswith(("Z", "z")):
+                value = value[:-1] + "+00:00"
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    logging.warning(f"Timestamp tidak valid ({value!r}), memakai waktu sekarang")
+    return time.time()
+
+class MetricSample:
+    """Snapshot metrik satu host; nilai disimpan dalam array double (NaN = tidak ada data)"""
+    
+    __slots__ = ("host", "timestamp", "values")
+    
+    def __init__(self, host, timestamp, values=None):
+        self.host = sys.intern(host)
+        self.timestamp = timestamp
+        self.values = values if values is not None else array("d", [math.nan] * len(METRIC_NAMES))
+    
+    def set(self, metric_name, value):
+        self.values[_METRIC_INDEX[metric_name]] = math.nan if value is None else value
+    
+    @classmethod
+    def from_metrics(cls, metrics, host="localhost"):
+        sample = cls(host, _parse_timestamp(metrics.get("timestamp")))
+        for name in METRIC_NAMES:
+            value = metrics.get(name)
+            if isinstance(value, (int, float)):
+                sample.set(name, value)
+        return sample
+    
+    def to_metrics(self):
+        """Mengembalikan format dict seperti get_prometheus_metrics"""
+        metrics = {name: None if math.isnan(value) else value for name, value in zip(METRIC_NAMES, self.values)}
+        metrics["timestamp"] = datetime.fromtimestamp(self.timestamp).isoformat()
+        return metrics
+
+class Issue:
+    """Masalah yang terdeteksi dalam analisis"""
+    
+    __slots__ = ("component", "severity", "description")
+    
+    def __init__(self, component, severity, description):
+        self.component = sys.intern(component)
+        self.severity = sys.intern(severity)
+        self.description = description
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(str(data.get("component", "unknown")), str(data.get("severity", "low")),
+                   str(data.get("description", "")))
+    
+    def to_dict(self):
+        return {"component": self.component, "severity": self.severity, "description": self.description}
+
+class Recommendation:
+    """Rekomendasi tindakan dari analisis"""
+    
+    __slots__ = ("action", "description", "ansible_task")
+    
+    def __init__(self, action, description, ansible_task=""):
+        self.action = sys.intern(action)
+        self.description = description
+        self.ansible_task = ansible_task
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(str(data.get("action", "alert_admin")), str(data.get("description", "")),
+                   str(data.get("ansible_task", "")))
+    
+    def to_dict(self):
+        return {"action": self.action, "description": self.description, "ansible_task": self.ansible_task}
+
+class Analysis:
+    """Hasil analisis ringkas: status, ringkasan, serta tuple Issue dan Recommendation"""
+    
+    __slots__ = ("status", "analysis", "issues", "recommendations")
+    
+    def __init__(self, status, analysis, issues=(), recommendations=()):
+        self.status = normalize_status(status)
+        self.analysis = analysis
+        self.issues = tuple(issues)
+        self.recommendations = tuple(recommendations)
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("status", "unknown"), str(data.get("analysis", "")),
+                   (Issue.from_dict(i) for i in data.get("issues", []) if isinstance(i, dict)),
+                   (Recommendation.from_dict(r) for r in data.get("recommendations", []) if isinstance(r, dict)))
+    
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "analysis": self.analysis,
+            "issues": [issue.to_dict() for issue in self.issues],
+            "recommendations": [rec.to_dict() for rec in self.recommendations]
+        }
+
+class ActionResult:
+    """Ringkasan hasil satu tindakan remediasi tanpa output perintah lengkap"""
+    
+    __slots__ = ("action", "status", "escalate", "recovered", "time_to_recover", "host", "timestamp")
+    
+    def __init__(self, action, status, escalate=False, recovered=None, time_to_recover=None,
+                 host=None, timestamp=None):
+        self.action = sys.intern(action)
+        self.status = sys.intern(status)
+        self.escalate = escalate
+        self.recovered = recovered
+        self.time_to_recover = time_to_recover
+        self.host = host
+        self.timestamp = timestamp
+    
+    @classmethod
+    def from_entry(cls, entry, host=None, timestamp=None):
+        """Membuat dari entri execution_results ({"action", "description", "result", "escalate"})"""
+        result = entry.get("result", {})
+        verification = result.get("verification", {})
+        return cls(entry.get("action", "unknown"), result.get("status", "unknown"), bool(entry.get("escalate")),
+                   verification.get("recovered"), verification.get("time_to_recover"), host, timestamp)
+    
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
 
 def get_prometheus_metrics():
     """Mengambil berbagai metrik server dari Prometheus"""
     metrics = {}
     
-    # Daftar query untuk mengambil metrik berbeda
-    queries = {
-        "cpu_usage": "100 - (avg by(instance) (irate(node_cpu_seconds_total{mode='idle'}[5m])) * 100)",
-        "memory_usage": "100 * (1 - ((node_memory_MemFree_bytes + node_memory_Cached_bytes + node_memory_Buffers_bytes) / node_memory_MemTotal_bytes))",
-        "disk_usage": "100 - ((node_filesystem_avail_bytes{mountpoint='/'} * 100) / node_filesystem_size_bytes{mountpoint='/'})",
-        "load_avg": "node_load1",
-        "network_receive": "irate(node_network_receive_bytes_total{device!='lo'}[5m])",
-        "network_transmit": "irate(node_network_transmit_bytes_total{device!='lo'}[5m])"
-    }
-    
     try:
-        for metric_name, query in queries.items():
+        import requests
+        for metric_name, query in PROMETHEUS_QUERIES.items():
             response = requests.get(f"{PROMETHEUS_URL}/api/v1/query", params={"query": query})
             response.raise_for_status()
             data = response.json()
@@ -58,8 +249,62 @@ def get_prometheus_metrics():
         logging.error(f"Error saat mengambil metrik: {str(e)}")
         return {}
 
-def analyze_with_gemini(metrics):
-    """Menganalisis metrik server menggunakan Gemini AI"""
+def query_prometheus_metric(metric_name):
+    """Mengambil satu nilai metrik terkini dari Prometheus"""
+    try:
+        import requests
+        response = requests.get(f"{PROMETHEUS_URL}/api/v1/query",
+                                params={"query": PROMETHEUS_QUERIES[metric_name]}, timeout=5)
+        response.raise_for_status()
+        data = response.json()
+        
+        if data["status"] == "success" and data["data"]["result"]:
+            return float(data["data"]["result"][0]["value"][1])
+        return None
+    except Exception as e:
+        logging.error(f"Error saat mengambil metrik {metric_name}: {str(e)}")
+        return None
+
+def _read_cpu_times():
+    """Membaca total dan idle jiffies dari /proc/stat"""
+    with open("/proc/stat", "r") as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    return sum(values), values[3] + values[4]  # idle + iowait
+
+def read_proc_metric(metric_name, cpu_sample=1.0):
+    """Membaca metrik langsung dari /proc untuk umpan balik cepat tanpa menunggu scrape Prometheus"""
+    try:
+        if metric_name == "disk_usage":
+            st = os.statvfs("/")
+            return 100 - (st.f_bavail * 100 / st.f_blocks)
+        
+        if metric_name == "memory_usage":
+            meminfo = {}
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    key, value = line.split(":", 1)
+                    meminfo[key] = int(value.split()[0])
+            free = meminfo["MemFree"] + meminfo["Cached"] + meminfo["Buffers"]
+            return 100 * (1 - free / meminfo["MemTotal"])
+        
+        if metric_name == "cpu_usage":
+            total_before, idle_before = _read_cpu_times()
+            time.sleep(cpu_sample)
+            total_after, idle_after = _read_cpu_times()
+            total = total_after - total_before
+            return 100 * (1 - (idle_after - idle_before) / total) if total else None
+        
+        if metric_name == "load_avg":
+            with open("/proc/loadavg", "r") as f:
+                return float(f.read().split()[0])
+        
+        return None
+    except Exception as e:
+        logging.error(f"Error membaca {metric_name} dari /proc: {str(e)}")
+        return None
+
+def analyze_with_gemini(metrics, model=None):
+    """Menganalisis metrik server menggunakan Gemini AI (atau model pengganti untuk replay), hasilnya Analysis"""
     try:
         prompt = f"""
         Sebagai AI untuk otomatisasi server, analisis metrik berikut dan berikan rekomendasi:
@@ -90,7 +335,7 @@ def analyze_with_gemini(metrics):
         kembalikan status "healthy" dengan analysis yang sesuai.
         """
         
-        response = model.generate_content(prompt)
+        response = (model or get_gemini_model()).generate_content(prompt)
         
         # Dapatkan text dari respons
         response_text = response.text
@@ -126,21 +371,20 @@ def analyze_with_gemini(metrics):
                 "recommendations": []
             }
             
-        logging.info(f"Analisis selesai. Status: {result.get('status', 'unknown')}")
-        return result
+        analysis = Analysis.from_dict(result)
+        logging.info(f"Analisis selesai. Status: {analysis.status}")
+        return analysis
         
     except Exception as e:
         logging.error(f"Error saat menganalisis dengan Gemini: {str(e)}")
-        return {
-            "status": "error",
-            "analysis": f"Terjadi kesalahan saat analisis: {str(e)}",
-            "issues": [],
-            "recommendations": []
-        }
+        return Analysis("error", f"Terjadi kesalahan saat analisis: {str(e)}")
 
 def execute_ansible_task(task_yaml):
     """Menjalankan task Ansible dari rekomendasi"""
     try:
+        import yaml
+        import ansible_runner
+        
         # Buat direktori untuk data Ansible
         ansible_dir = './ansible'
         os.makedirs(ansible_dir, exist_ok=True)
@@ -257,6 +501,7 @@ def identify_high_resource_service():
 def send_telegram_notification(message, token="<ID-TOKEN>", chat_id="<ID-CHAT>"):
     """Mengirim notifikasi ke Telegram"""
     try:
+        import requests
         url = f"https://api.telegram.org/bot{token}/sendMessage"
         payload = {
             "chat_id": chat_id,
@@ -274,15 +519,18 @@ def send_telegram_notification(message, token="<ID-TOKEN>", chat_id="<ID-CHAT>")
         return {"status": "failed", "error": str(e)}
 
 
-def format_notification_message(analysis, execution_results=None):
+def format_notification_message(analysis, execution_results=None, host=None):
     """Membuat pesan notifikasi yang informatif berdasarkan analisis dan tindakan"""
     # Dapatkan hostname dan alamat IP server
     try:
-        hostname_cmd = "hostname"
-        hostname = os.popen(hostname_cmd).read().strip()
-        
-        ip_cmd = "hostname -I | awk '{print $1}'"
-        ip_address = os.popen(ip_cmd).read().strip()
+        if host:
+            hostname, ip_address = host
+        else:
+            hostname_cmd = "hostname"
+            hostname = os.popen(hostname_cmd).read().strip()
+            
+            ip_cmd = "hostname -I | awk '{print $1}'"
+            ip_address = os.popen(ip_cmd).read().strip()
     except Exception as e:
         hostname = "unknown"
         ip_address = "unknown"
@@ -295,15 +543,15 @@ def format_notification_message(analysis, execution_results=None):
     message += f"<b>Waktu:</b> {current_time}\n\n"
     
     # Status dan ringkasan
-    status_emoji = "🔴" if analysis["status"] == "critical" else "🟠" if analysis["status"] == "warning" else "🟢"
-    message += f"<b>Status:</b> {status_emoji} {analysis['status'].upper()}\n"
-    message += f"<b>Analisis:</b> {analysis['analysis']}\n\n"
+    status_emoji = "🔴" if analysis.status == "critical" else "🟠" if analysis.status == "warning" else "🟢"
+    message += f"<b>Status:</b> {status_emoji} {analysis.status.upper()}\n"
+    message += f"<b>Analisis:</b> {analysis.analysis}\n\n"
     
     # Masalah yang terdeteksi
     message += "<b>🔍 Masalah Terdeteksi:</b>\n"
-    for issue in analysis.get("issues", []):
-        severity_emoji = "🔴" if issue["severity"] == "high" else "🟠" if issue["severity"] == "medium" else "🟡"
-        message += f"{severity_emoji} <b>{issue['component'].upper()}:</b> {issue['description']}\n"
+    for issue in analysis.issues:
+        severity_emoji = "🔴" if issue.severity == "high" else "🟠" if issue.severity == "medium" else "🟡"
+        message += f"{severity_emoji} <b>{issue.component.upper()}:</b> {issue.description}\n"
     
     message += "\n"
     
@@ -313,7 +561,7 @@ def format_notification_message(analysis, execution_results=None):
         for action in execution_results:
             result = action["result"]
             if "status" in result:
-                status_icon = "✅" if result["status"] in ["success", "completed"] else "❌"
+                status_icon = "✅" if result["status"] in ["success", "completed"] else "🔸" if result["status"] == "dry_run" else "❌"
                 message += f"{status_icon} {action['description']}\n"
                 
                 # Detail tambahan untuk pembersihan disk
@@ -323,14 +571,24 @@ def format_notification_message(analysis, execution_results=None):
                 # Detail untuk restart service
                 if "service" in result:
                     message += f"   └ Layanan: {result['service']}\n"
+                
+                # Hasil verifikasi pemulihan
+                verification = result.get("verification", {})
+                if verification.get("recovered"):
+                    message += f"   └ Pulih dalam {verification['time_to_recover']} detik\n"
+                elif verification.get("recovered") is False:
+                    message += f"   └ ❗ Belum pulih setelah {verification['elapsed']} detik, perlu penanganan manual\n"
+                
+                if action.get("escalate") and "reason" in result:
+                    message += f"   └ ❗ {result['reason']}, perlu penanganan manual\n"
     else:
         message += "<b>🤖 Status:</b> Monitoring aktif, tidak ada tindakan otomatis yang diambil.\n"
     
     # Rekomendasi tambahan
     message += "\n<b>📋 Rekomendasi:</b>\n"
-    for rec in analysis.get("recommendations", [])[:2]:  # Batasi hanya 2 rekomendasi teratas
-        if rec.get("action") != "restart_service" or not execution_results:  # Hindari duplikasi dengan tindakan yang sudah diambil
-            message += f"• {rec['description']}\n"
+    for rec in analysis.recommendations[:2]:  # Batasi hanya 2 rekomendasi teratas
+        if rec.action != "restart_service" or not execution_results:  # Hindari duplikasi dengan tindakan yang sudah diambil
+            message += f"• {rec.description}\n"
     
     # Tambahkan footer
     message += f"\n<i>Pesan ini dikirim otomatis oleh Server AI Monitoring System</i>"
@@ -340,6 +598,9 @@ def format_notification_message(analysis, execution_results=None):
 def execute_ansible_task(task_yaml):
     """Menjalankan task Ansible dari rekomendasi"""
     try:
+        import yaml
+        import ansible_runner
+        
         # Buat direktori untuk data Ansible
         ansible_dir = './ansible'
         os.makedirs(ansible_dir, exist_ok=True)
@@ -369,7 +630,7 @@ def execute_ansible_task(task_yaml):
                 yaml.dump(playbook_content, f)
                 
             logging.info(f"Playbook Ansible disimpan di: {playbook_file}")
-            logging.info(f"Konten playbook: {yaml.dump(playbook_content)}")
+            logging.info(f"Konten playbook: {_truncate_for_log(json.dumps(playbook_content))}")
             
             # Jalankan ansible-playbook langsung dengan os.system untuk debugging
             cmd = f"ansible-playbook -v {playbook_file}"
@@ -396,7 +657,7 @@ def execute_ansible_task(task_yaml):
             logging.error(f"Error parsing YAML task: {ye}")
             # Fallback: simpan task sebagai string
             task_str = task_yaml.strip()
-            logging.info(f"Using raw task string: {task_str}")
+            logging.info(f"Using raw task string: {_truncate_for_log(task_str)}")
             
             # Membuat file playbook manual
             playbook_content = f"""---
@@ -423,11 +684,12 @@ def execute_ansible_task(task_yaml):
         logging.error(f"Error saat menjalankan Ansible task: {str(e)}")
         return {"status": "failed", "error": str(e)}
 
-def execute_direct_command(recommendation):
+def execute_direct_command(recommendation, target=None):
     """Eksekusi langsung untuk restart service atau kill proses"""
     try:
-        # Identifikasi proses bermasalah
-        target = identify_high_resource_service()
+        # Identifikasi proses bermasalah (jika belum ditentukan pemanggil)
+        if target is None:
+            target = identify_high_resource_service()
         
         if not target:
             logging.warning("Tidak dapat mengidentifikasi target untuk tindakan")
@@ -620,62 +882,207 @@ def find_and_handle_resource_hogs():
         logging.error(f"Error saat menangani proses CPU tinggi: {str(e)}")
         return []
 
-def send_daily_summary():
-    """Mengirim ringkasan harian status server"""
+def _hist_bucket(value):
+    """Menentukan kunci bucket histogram logaritmik untuk sebuah nilai"""
+    if value <= 0:
+        return "z"
+    return str(math.floor(math.log(value, STATS_HIST_RATIO)))
+
+def _hist_value(bucket):
+    """Nilai representatif (titik tengah geometris) dari sebuah bucket"""
+    if bucket == "z":
+        return 0.0
+    return STATS_HIST_RATIO ** (int(bucket) + 0.5)
+
+def load_daily_stats():
+    """Membaca agregat berjalan dari file statistik"""
     try:
-        # Dapatkan informasi CPU, memory, dan disk
-        cpu_cmd = "top -bn1 | grep 'Cpu(s)' | awk '{print $2 + $4}'"
-        cpu_usage = os.popen(cpu_cmd).read().strip()
+        with open(STATS_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"hours": {}}
+    except Exception as e:
+        logging.error(f"Error membaca statistik harian: {str(e)}")
+        return {"hours": {}}
+
+def save_daily_stats(stats):
+    """Menyimpan agregat berjalan secara ringkas dan atomik"""
+    os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+    tmp_file = f"{STATS_FILE}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(stats, f, separators=(",", ":"))
+    os.replace(tmp_file, STATS_FILE)
+
+def update_daily_stats(metrics, analysis, execution_results=None):
+    """Memperbarui agregat per jam (min, max, mean, p95, status, tindakan) untuk siklus ini"""
+    try:
+        stats = load_daily_stats()
+        hours = stats.setdefault("hours", {})
+        now = datetime.now()
         
-        mem_cmd = "free -m | grep Mem | awk '{print $3/$2 * 100.0}'"
-        mem_usage = os.popen(mem_cmd).read().strip()
+        # Slot per jam, kunci YYYYMMDDHH agar bisa dibandingkan sebagai string
+        slot = hours.setdefault(now.strftime("%Y%m%d%H"), {"metrics": {}, "status": {}, "actions": {}})
         
-        disk_cmd = "df -h / | tail -1 | awk '{print $5}'"
-        disk_usage = os.popen(disk_cmd).read().strip()
+        for name, value in metrics.items():
+            # Lewati nilai non-numerik dan non-finite (Prometheus bisa mengembalikan NaN/Inf)
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+                continue
+            agg = slot["metrics"].get(name)
+            if agg is None:
+                agg = slot["metrics"][name] = {"n": 0, "min": value, "max": value, "sum": 0.0, "hist": {}}
+            agg["n"] += 1
+            agg["min"] = min(agg["min"], value)
+            agg["max"] = max(agg["max"], value)
+            agg["sum"] += value
+            bucket = _hist_bucket(value)
+            agg["hist"][bucket] = agg["hist"].get(bucket, 0) + 1
+        
+        # Status sudah dinormalisasi oleh Analysis, jadi kunci tetap terbatas
+        slot["status"][analysis.status] = slot["status"].get(analysis.status, 0) + 1
+        
+        for action in execution_results or []:
+            status = action["result"].get("status", "unknown")
+            if action["result"].get("verification", {}).get("recovered") is False:
+                status = "not_recovered"
+            key = f"{action.get('action', 'unknown')}:{status}"
+            slot["actions"][key] = slot["actions"].get(key, 0) + 1
         
-        uptime_cmd = "uptime -p"
-        uptime = os.popen(uptime_cmd).read().strip()
+        # Buang slot di luar jendela statistik
+        cutoff = (now - timedelta(hours=STATS_WINDOW_HOURS - 1)).strftime("%Y%m%d%H")
+        for hour_key in [k for k in hours if k < cutoff]:
+            del hours[hour_key]
+        
+        save_daily_stats(stats)
+        return stats
+    except Exception as e:
+        logging.error(f"Error memperbarui statistik harian: {str(e)}")
+        return None
+
+def summarize_daily_stats(stats):
+    """Menggabungkan slot per jam menjadi statistik 24 jam"""
+    merged = {}
+    status_counts = {}
+    action_counts = {}
+    
+    for slot in stats.get("hours", {}).values():
+        for name, agg in slot.get("metrics", {}).items():
+            total = merged.get(name)
+            if total is None:
+                total = merged[name] = {"n": 0, "min": agg["min"], "max": agg["max"], "sum": 0.0, "hist": {}}
+            total["n"] += agg["n"]
+            total["min"] = min(total["min"], agg["min"])
+            total["max"] = max(total["max"], agg["max"])
+            total["sum"] += agg["sum"]
+            for bucket, count in agg["hist"].items():
+                total["hist"][bucket] = total["hist"].get(bucket, 0) + count
+        for status, count in slot.get("status", {}).items():
+            status_counts[status] = status_counts.get(status, 0) + count
+        for action, count in slot.get("actions", {}).items():
+            action_counts[action] = action_counts.get(action, 0) + count
+    
+    metrics = {}
+    for name, total in merged.items():
+        if not total["n"]:
+            continue
+        # p95 dari histogram: bucket pertama yang mencapai 95% sampel
+        target = math.ceil(0.95 * total["n"])
+        seen = 0
+        p95 = total["max"]
+        for bucket in sorted(total["hist"], key=_hist_value):
+            seen += total["hist"][bucket]
+            if seen >= target:
+                p95 = _hist_value(bucket)
+                break
+        metrics[name] = {
+            "min": total["min"],
+            "max": total["max"],
+            "mean": total["sum"] / total["n"],
+            "p95": min(max(p95, total["min"]), total["max"]),
+            "samples": total["n"]
+        }
+    
+    return {"metrics": metrics, "status": status_counts, "actions": action_counts}
+
+def _format_metric_value(name, value):
+    """Format nilai metrik sesuai satuannya"""
+    if name.endswith("_usage"):
+        return f"{value:.1f}%"
+    if name.startswith("network_"):
+        return f"{value / 1024:.1f} KB/s"
+    return f"{value:.2f}"
+
+def _read_uptime():
+    """Membaca uptime dari /proc tanpa menjalankan proses eksternal"""
+    try:
+        with open("/proc/uptime", "r") as f:
+            seconds = int(float(f.read().split()[0]))
+        days, rem = divmod(seconds, 86400)
+        hours, rem = divmod(rem, 3600)
+        return f"{days} hari {hours} jam {rem // 60} menit"
+    except Exception as e:
+        logging.error(f"Error membaca uptime: {str(e)}")
+        return "unknown"
+
+def send_daily_summary():
+    """Mengirim ringkasan harian status server dari agregat berjalan 24 jam"""
+    try:
+        summary = summarize_daily_stats(load_daily_stats())
         
         # Format message
         message = "<b>📊 LAPORAN STATUS SERVER HARIAN 📊</b>\n\n"
         message += f"<b>Waktu:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        message += f"<b>Uptime:</b> {uptime}\n\n"
-        
-        message += "<b>Penggunaan Sumber Daya:</b>\n"
-        message += f"🔸 CPU: {cpu_usage}%\n"
-        message += f"🔸 Memori: {mem_usage}%\n"
-        message += f"🔸 Disk: {disk_usage}\n\n"
-        
-        # Baca laporan terbaru
-        reports_dir = "reports"
-        reports = []
-        
-        if os.path.exists(reports_dir):
-            for file in sorted(os.listdir(reports_dir), reverse=True):
-                if file.startswith("report_") and file.endswith(".json"):
-                    try:
-                        with open(os.path.join(reports_dir, file), 'r') as f:
-                            report_data = json.load(f)
-                            reports.append({
-                                'file': file,
-                                'status': report_data.get('status', 'unknown'),
-                                'timestamp': file.split('_')[1].split('.')[0]
-                            })
-                    except Exception as e:
-                        logging.error(f"Error membaca file laporan {file}: {str(e)}")
-                        
-                    # Hanya baca 5 file terbaru
-                    if len(reports) >= 5:
-                        break
+        message += f"<b>Uptime:</b> {_read_uptime()}\n\n"
         
-        if reports:
-            message += "<b>Laporan Terbaru:</b>\n"
-            for i, report in enumerate(reports):
-                status_emoji = "🔴" if report["status"] == "critical" else "🟠" if report["status"] == "warning" else "🟢"
-                timestamp = datetime.strptime(report["timestamp"], "%Y%m%d_%H%M%S").strftime("%d/%m %H:%M")
-                message += f"{i+1}. {status_emoji} {timestamp} - {report['status'].upper()}\n"
+        labels = {
+            "cpu_usage": "CPU",
+            "memory_usage": "Memori",
+            "disk_usage": "Disk",
+            "load_avg": "Load",
+            "network_receive": "Net RX",
+            "network_transmit": "Net TX"
+        }
+        
+        if summary["metrics"]:
+            message += f"<b>Penggunaan Sumber Daya ({STATS_WINDOW_HOURS} jam):</b>\n"
+            for name, label in labels.items():
+                agg = summary["metrics"].get(name)
+                if not agg:
+                    continue
+                fmt = lambda v: _format_metric_value(name, v)
+                message += (f"🔸 {label}: rata-rata {fmt(agg['mean'])}, p95 {fmt(agg['p95'])}, "
+                            f"min {fmt(agg['min'])}, max {fmt(agg['max'])}\n")
+            message += "\n"
         else:
-            message += "<b>Tidak ada laporan terbaru.</b>\n"
+            message += "<b>Belum ada data metrik dalam 24 jam terakhir.</b>\n\n"
+        
+        if summary["status"]:
+            message += "<b>Status Analisis:</b>\n"
+            for status in ["critical", "warning", "healthy"] + sorted(set(summary["status"]) - {"critical", "warning", "healthy"}):
+                count = summary["status"].get(status)
+                if not count:
+                    continue
+                status_emoji = "🔴" if status == "critical" else "🟠" if status == "warning" else "🟢" if status == "healthy" else "⚪"
+                message += f"{status_emoji} {status.upper()}: {count}x\n"
+            message += "\n"
+        
+        if summary["actions"]:
+            message += "<b>Tindakan Otomatis:</b>\n"
+            for action, count in sorted(summary["actions"].items()):
+                name, _, result = action.partition(":")
+                status_icon = "✅" if result in ["success", "completed"] else "❌"
+                message += f"{status_icon} {name} ({result}): {count}x\n"
+        else:
+            message += "<b>Tidak ada tindakan otomatis.</b>\n"
+        
+        # Efektivitas tindakan dan mean-time-to-recover dari riwayat verifikasi
+        history = load_remediation_history()
+        if history:
+            message += f"\n<b>Efektivitas Remediasi ({REMEDIATION_WINDOW} percobaan terakhir):</b>\n"
+            for key, entry in sorted(history.items()):
+                outcomes = entry.get("outcomes", [])
+                recovered = [ttr for ttr in outcomes if ttr is not None]
+                mttr = f"{sum(recovered) / len(recovered):.1f} detik" if recovered else "-"
+                message += f"🔹 {key}: {len(recovered)}/{len(outcomes)} pulih, MTTR {mttr}\n"
             
         message += "\n<i>Laporan ini dikirim otomatis oleh Server AI Monitoring System</i>"
         
@@ -687,66 +1094,300 @@ def send_daily_summary():
         return {"status": "failed", "error": str(e)}
         
 
-def main():
-    """Fungsi utama yang menjalankan workflow otomatisasi"""
-    logging.info("Memulai proses otomatisasi server")
+def verify_remediation(components, timeout=None, interval=None):
+    """Memantau metrik terkait setelah tindakan sampai semua komponen pulih atau batas waktu habis"""
+    timeout = VERIFY_TIMEOUT if timeout is None else timeout
+    interval = VERIFY_INTERVAL if interval is None else interval
+    targets = {c: RECOVERY_THRESHOLDS[c] for c in components if c in RECOVERY_THRESHOLDS}
+    if not targets:
+        return {"recovered": None, "reason": "tidak ada metrik untuk diverifikasi"}
     
-    # Ambil metrik dari Prometheus
-    metrics = get_prometheus_metrics()
-    if not metrics:
-        logging.error("Gagal mendapatkan metrik. Menghentikan proses.")
+    started = time.monotonic()
+    recovered_at = {}
+    values = {}
+    while True:
+        for component, (metric_name, threshold) in targets.items():
+            if component in recovered_at:
+                continue
+            # Utamakan /proc (instan), Prometheus sebagai cadangan
+            value = read_proc_metric(metric_name)
+            if value is None:
+                value = query_prometheus_metric(metric_name)
+            values[component] = value
+            if value is not None and value < threshold:
+                recovered_at[component] = round(time.monotonic() - started, 1)
+        
+        elapsed = time.monotonic() - started
+        if len(recovered_at) == len(targets):
+            logging.info(f"Pemulihan terverifikasi dalam {elapsed:.1f} detik: {values}")
+            return {"recovered": True, "time_to_recover": max(recovered_at.values()),
+                    "components": recovered_at, "values": values}
+        if elapsed + interval > timeout:
+            logging.warning(f"Belum pulih setelah {elapsed:.1f} detik: {values}")
+            return {"recovered": False, "elapsed": round(elapsed, 1),
+                    "components": recovered_at, "values": values}
+        time.sleep(interval)
+
+def _action_verification(verification, components):
+    """Mengambil hasil verifikasi untuk komponen yang terkait dengan satu tindakan"""
+    if not components or verification.get("recovered") is None:
+        return {"recovered": None, "reason": "tidak ada komponen terkait untuk diverifikasi"}
+    
+    times = [verification["components"].get(c) for c in components]
+    if all(t is not None for t in times):
+        return {"recovered": True, "time_to_recover": max(times)}
+    return {"recovered": False, "elapsed": verification["elapsed"],
+            "values": {c: verification["values"].get(c) for c in components}}
+
+def remediation_key(action, target=None):
+    """Kunci riwayat remediasi: tindakan + target (nama layanan, "process" untuk PID, "*" jika tidak diketahui)"""
+    if not target:
+        target = "*"
+    elif target.startswith("process:"):
+        target = "process"
+    return f"{action}:{target}"
+
+def load_remediation_history():
+    """Membaca riwayat hasil remediasi per tindakan+target"""
+    try:
+        with open(REMEDIATION_HISTORY_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.error(f"Error membaca riwayat remediasi: {str(e)}")
+        return {}
+
+def save_remediation_history(history):
+    """Menyimpan riwayat remediasi secara atomik"""
+    try:
+        os.makedirs(os.path.dirname(REMEDIATION_HISTORY_FILE), exist_ok=True)
+        tmp_file = f"{REMEDIATION_HISTORY_FILE}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(history, f, separators=(",", ":"))
+        os.replace(tmp_file, REMEDIATION_HISTORY_FILE)
+    except Exception as e:
+        logging.error(f"Error menyimpan riwayat remediasi: {str(e)}")
+
+def _history_entry(history, key):
+    """Entri riwayat: waktu pulih N percobaan terakhir (None = tidak pulih) dan jumlah skip sejak percobaan terakhir"""
+    entry = history.get(key)
+    if not isinstance(entry, dict) or "outcomes" not in entry:
+        entry = history[key] = {"outcomes": [], "skipped": 0}
+    return entry
+
+def remediation_policy(overrides=None):
+    """Parameter keputusan remediasi; default dari konstanta modul, bisa di-override (misalnya oleh replay)"""
+    policy = {
+        "min_attempts": REMEDIATION_MIN_ATTEMPTS,
+        "min_success_rate": REMEDIATION_MIN_SUCCESS_RATE,
+        "window": REMEDIATION_WINDOW,
+        "probe_every": REMEDIATION_PROBE_EVERY
+    }
+    for name, value in (overrides or {}).items():
+        if name not in policy:
+            raise ValueError(f"Parameter policy tidak dikenal: {name}")
+        policy[name] = value
+    return policy
+
+def record_remediation_outcome(key, verification, history=None, policy=None):
+    """Mencatat hasil verifikasi agar keputusan berikutnya memakai data efektivitas tindakan
+    
+    Tanpa `history`, riwayat dibaca dan disimpan ke REMEDIATION_HISTORY_FILE.
+    """
+    if verification.get("recovered") is None:
         return
+    policy = policy or remediation_policy()
+    persist = history is None
+    history = load_remediation_history() if persist else history
+    entry = _history_entry(history, key)
+    entry["outcomes"].append(verification["time_to_recover"] if verification["recovered"] else None)
+    del entry["outcomes"][:-policy["window"]]
+    entry["skipped"] = 0
+    if persist:
+        save_remediation_history(history)
+
+def record_remediation_skip(key, history=None):
+    """Mencatat tindakan yang dilewati, untuk menentukan kapan probe berikutnya"""
+    persist = history is None
+    history = load_remediation_history() if persist else history
+    _history_entry(history, key)["skipped"] += 1
+    if persist:
+        save_remediation_history(history)
+
+def record_remediation_attempt(key, history=None):
+    """Mereset penghitung skip saat tindakan dijalankan, agar probe yang gagal tidak membuka jalan di setiap siklus"""
+    persist = history is None
+    history = load_remediation_history() if persist else history
+    entry = history.get(key)
+    if isinstance(entry, dict) and entry.get("skipped"):
+        entry["skipped"] = 0
+        if persist:
+            save_remediation_history(history)
+
+def is_action_effective(key, history=None, policy=None):
+    """Memeriksa apakah tindakan layak dijalankan berdasarkan riwayat pemulihan terbarunya"""
+    policy = policy or remediation_policy()
+    history = load_remediation_history() if history is None else history
+    entry = history.get(key)
+    if not isinstance(entry, dict):
+        return True
+    outcomes = entry.get("outcomes", [])[-policy["window"]:]
+    if len(outcomes) < policy["min_attempts"]:
+        return True
+    if sum(ttr is not None for ttr in outcomes) / len(outcomes) >= policy["min_success_rate"]:
+        return True
     
-    # Analisis dengan Gemini AI
-    analysis = analyze_with_gemini(metrics)
+    # Probe berkala agar skor bisa pulih setelah penyebabnya diperbaiki
+    if entry.get("skipped", 0) >= policy["probe_every"]:
+        logging.info(f"Mencoba ulang {key} sebagai probe setelah {entry['skipped']} kali dilewati")
+        return True
+    return False
+
+def run_remediation_action(action, description, func, components, resolve_target=None, dry_run=False,
+                           history=None, policy=None):
+    """Menjalankan satu tindakan remediasi (tanpa verifikasi) jika riwayatnya layak"""
+    # Target juga diidentifikasi saat dry-run (hanya membaca state) agar kunci riwayat sama dengan run nyata
+    target = resolve_target() if resolve_target else None
+    key = remediation_key(action, target)
     
-    # Simpan laporan
-    report_file = save_report(analysis)
-    logging.info(f"Laporan analisis disimpan di {report_file}")
+    if not is_action_effective(key, history, policy):
+        logging.warning(f"Tindakan {key} jarang berhasil berdasarkan riwayat, eskalasi ke admin")
+        record_remediation_skip(key, history)
+        return {
+            "action": action,
+            "description": description,
+            "target": key,
+            "result": {"status": "skipped", "reason": "tidak efektif berdasarkan riwayat"},
+            "escalate": True
+        }
+    
+    # Probe dry-run juga dihitung sebagai percobaan agar simulasi policy sama dengan run nyata
+    record_remediation_attempt(key, history)
     
+    if resolve_target and not target:
+        logging.warning("Tidak dapat mengidentifikasi target untuk tindakan")
+        result = {"status": "failed", "error": "Tidak dapat mengidentifikasi target"}
+    elif dry_run:
+        logging.info(f"[dry-run] Tindakan {key} tidak dijalankan")
+        return {"action": action, "description": description, "target": key, "result": {"status": "dry_run"}}
+    else:
+        result = func(target)
+    logging.info(f"Hasil tindakan {key}: {_truncate_for_log(result)}")
+    return {"action": action, "description": description, "target": key, "result": result}
+
+def run_remediations(plans, dry_run=False, history=None, policy=None):
+    """Menjalankan semua tindakan lalu memverifikasi pemulihan sekali untuk satu siklus
+    
+    `history` (dict) dan `policy` dipakai replay agar keputusan tidak bergantung pada riwayat produksi.
+    """
     execution_results = []
+    pending = []
+    for action, description, func, components, resolve_target in plans:
+        entry = run_remediation_action(action, description, func, components, resolve_target, dry_run,
+                                       history, policy)
+        execution_results.append(entry)
+        status = entry["result"].get("status")
+        if status in ["success", "completed"]:
+            pending.append((entry, components))
+        elif status not in ["skipped", "dry_run"]:
+            # Eksekusi gagal (failed/timeout/...) dihitung sebagai tidak pulih
+            record_remediation_outcome(entry["target"], {"recovered": False}, history, policy)
+            entry["escalate"] = True
+    
+    if pending:
+        # Satu verifikasi per siklus, total waktu tunggu dibatasi VERIFY_TIMEOUT
+        all_components = sorted({c for _, components in pending for c in components})
+        verification = verify_remediation(all_components)
+        for entry, components in pending:
+            action_verification = _action_verification(verification, components)
+            entry["result"]["verification"] = action_verification
+            record_remediation_outcome(entry["target"], action_verification, history, policy)
+            entry["escalate"] = action_verification.get("recovered") is False
+    
+    return execution_results
+
+def plan_remediations(analysis, resolve_targets=True):
+    """Menentukan tindakan remediasi (action, description, func, components, resolve_target) dari hasil analisis
+    
+    Replay memakai resolve_targets=False karena proses di mesin ini tidak terkait dengan host yang di-replay.
+    """
+    plans = []
     
     # Cek masalah disk
-    disk_issue = next((issue for issue in analysis.get("issues", []) 
-                     if issue.get("component") == "disk" and issue.get("severity") == "high"), None)
+    disk_issue = next((issue for issue in analysis.issues
+                     if issue.component == "disk" and issue.severity == "high"), None)
     
     if disk_issue:
         logging.warning("Terdeteksi masalah disk usage tinggi! Menjalankan pembersihan disk...")
-        disk_result = clean_disk_space()
-        logging.info(f"Hasil pembersihan disk: {disk_result}")
-        execution_results.append({
-            "description": "Pembersihan disk otomatis",
-            "result": disk_result
-        })
+        plans.append(("clean_disk", "Pembersihan disk otomatis", lambda target: clean_disk_space(), ["disk"], None))
     
     # Cek status dan jalankan rekomendasi jika perlu
-    if analysis["status"] == "critical":
+    if analysis.status == "critical":
         logging.warning("Terdeteksi masalah CRITICAL! Menjalankan rekomendasi otomatis...")
         
-        for rec in analysis.get("recommendations", []):
-            if rec.get("action") == "restart_service":
-                logging.info(f"Menjalankan tugas: {rec['description']}")
+        # Komponen yang diharapkan pulih setelah restart/kill; kosong berarti tidak diverifikasi
+        resource_components = sorted({issue.component for issue in analysis.issues
+                                      if issue.component in ["cpu", "memory"]})
+        
+        for rec in analysis.recommendations:
+            if rec.action == "restart_service":
+                logging.info(f"Menjalankan tugas: {rec.description}")
                 
                 # Langsung gunakan direct command (skip Ansible)
-                result = execute_direct_command(rec)
-                logging.info(f"Hasil eksekusi direct: {result}")
-                
-                execution_results.append({
-                    "description": rec["description"],
-                    "result": result
-                })
-        
-        # Simpan hasil eksekusi
-        if execution_results:
-            results_dir = "reports"
-            os.makedirs(results_dir, exist_ok=True)
-            results_file = f"{results_dir}/execution_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(results_file, "w") as f:
-                json.dump(execution_results, f, indent=2)
-            logging.info(f"Hasil eksekusi disimpan di {results_file}")
+                plans.append((rec.action, rec.description,
+                              lambda target, rec=rec: execute_direct_command(rec.to_dict(), target),
+                              resource_components, identify_high_resource_service if resolve_targets else None))
+    
+    return plans
+
+def should_notify(analysis, execution_results):
+    """Notifikasi dikirim untuk status critical/warning atau jika ada tindakan yang perlu eskalasi"""
+    escalate = any(action.get("escalate") for action in execution_results)
+    return analysis.status in ["critical", "warning"] or escalate
+
+def main(dry_run=False):
+    """Fungsi utama yang menjalankan workflow otomatisasi; mengembalikan exit code (0 sukses, 1 gagal)"""
+    logging.info("Memulai proses otomatisasi server")
+    
+    # Ambil metrik dari Prometheus
+    metrics = get_prometheus_metrics()
+    if not metrics:
+        logging.error("Gagal mendapatkan metrik. Menghentikan proses.")
+        return 1
+    
+    # Analisis dengan Gemini AI
+    analysis = analyze_with_gemini(metrics)
+    
+    # Simpan laporan
+    report_file = save_report(analysis.to_dict())
+    logging.info(f"Laporan analisis disimpan di {report_file}")
+    
+    # Dry-run memakai salinan riwayat di memori agar file riwayat produksi tidak berubah
+    history = load_remediation_history() if dry_run else None
+    execution_results = run_remediations(plan_remediations(analysis), dry_run=dry_run, history=history)
+    
+    if dry_run:
+        # Dry-run tidak boleh memengaruhi laporan eksekusi, statistik harian, maupun Telegram
+        if should_notify(analysis, execution_results):
+            print(format_notification_message(analysis, execution_results if execution_results else None))
+        print(json.dumps(execution_results, indent=2))
+        return 0
+    
+    # Simpan hasil eksekusi
+    if analysis.status == "critical" and execution_results:
+        results_dir = "reports"
+        os.makedirs(results_dir, exist_ok=True)
+        results_file = f"{results_dir}/execution_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(results_file, "w") as f:
+            json.dump(execution_results, f, indent=2)
+        logging.info(f"Hasil eksekusi disimpan di {results_file}")
+    
+    # Perbarui agregat berjalan untuk ringkasan harian
+    update_daily_stats(metrics, analysis, execution_results)
                 
-    # Kirim notifikasi ke Telegram
-    if analysis["status"] in ["critical", "warning"]:
+    # Kirim notifikasi ke Telegram (selalu jika ada tindakan yang perlu eskalasi)
+    if should_notify(analysis, execution_results):
         # Format pesan notifikasi
         message = format_notification_message(analysis, execution_results if execution_results else None)
         
@@ -755,11 +1396,317 @@ def main():
         telegram_result = send_telegram_notification(message)
         logging.info(f"Hasil pengiriman notifikasi: {telegram_result}")
         
-    elif analysis["status"] == "warning":
+    elif analysis.status == "warning":
         logging.info("Terdeteksi WARNING. Menyimpan rekomendasi untuk review.")
         
     else:
         logging.info("Server dalam kondisi baik. Tidak ada tindakan yang diperlukan.")
+    
+    return 0
+
+def get_prometheus_range(start, end, step):
+    """Mengambil data range Prometheus (query_range) untuk semua metrik, untuk direkam dan di-replay"""
+    import requests
+    history = {}
+    for metric_name, query in PROMETHEUS_QUERIES.items():
+        response = requests.get(f"{PROMETHEUS_URL}/api/v1/query_range",
+                                params={"query": query, "start": start, "end": end, "step": step})
+        response.raise_for_status()
+        history[metric_name] = response.json()
+    return history
+
+def _iter_range_samples(history):
+    """Menggabungkan data range per metrik (satu potongan waktu) menjadi MetricSample berurutan waktu"""
+    samples = {}
+    for metric_name, response in history.items():
+        if metric_name not in PROMETHEUS_QUERIES:
+            continue
+        seen = set()
+        for series in response.get("data", {}).get("result", []):
+            instance = series.get("metric", {}).get("instance", "localhost")
+            # Sama seperti get_prometheus_metrics: hanya seri pertama per host
+            if instance in seen:
+                continue
+            seen.add(instance)
+            instance = sys.intern(instance)
+            for ts, value in series.get("values", []):
+                key = (float(ts), instance)
+                sample = samples.get(key)
+                if sample is None:
+                    sample = samples[key] = MetricSample(instance, key[0])
+                sample.set(metric_name, float(value))
+    
+    for key in sorted(samples):
+        yield samples.pop(key)
+
+def record_prometheus_history(output, start, end, step, chunk_points=None):
+    """Merekam riwayat metrik per potongan waktu ke file JSONL (satu snapshot per baris, urut waktu)"""
+    chunk_points = RECORD_CHUNK_POINTS if chunk_points is None else chunk_points
+    written = 0
+    with open(output, "w") as f:
+        chunk_start = start
+        while chunk_start <= end:
+            # query_range inklusif di kedua ujung, jadi potongan berikutnya mulai satu step setelahnya
+            chunk_end = min(end, chunk_start + (chunk_points - 1) * step)
+            for sample in _iter_range_samples(get_prometheus_range(chunk_start, chunk_end, step)):
+                metrics = sample.to_metrics()
+                metrics["timestamp"] = sample.timestamp
+                metrics["instance"] = sample.host
+                f.write(json.dumps(metrics, separators=(",", ":")) + "\n")
+                written += 1
+            chunk_start = chunk_end + step
+    return written
+
+def load_replay_samples(path):
+    """Membaca riwayat metrik untuk replay: hasil `record` (JSONL, di-stream per baris) atau snapshot JSON"""
+    if path.endswith(".jsonl"):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    metrics = json.loads(line)
+                    yield MetricSample.from_metrics(metrics, metrics.get("instance", "localhost"))
+        return
+    
+    # File .json dimuat utuh ke memori, jadi ukurannya dibatasi
+    size = os.path.getsize(path)
+    if size > REPLAY_JSON_MAX_BYTES:
+        raise ValueError(f"{path} berukuran {size} byte, melebihi REPLAY_JSON_MAX_BYTES; gunakan format .jsonl")
+    
+    with open(path, "r") as f:
+        data = json.load(f)
+    
+    for metrics in data if isinstance(data, list) else [data]:
+        yield MetricSample.from_metrics(metrics, metrics.get("instance", "localhost"))
+
+class ReplayModel:
+    """Pengganti model Gemini untuk replay: analisis berbasis ambang tanpa panggilan API"""
+    
+    COMPONENTS = {"cpu_usage": "cpu", "memory_usage": "memory", "disk_usage": "disk"}
+    
+    def __init__(self, thresholds=None):
+        # Ambang (warning, critical) per metrik
+        self.thresholds = thresholds or {"cpu_usage": (80, 95), "memory_usage": (85, 95), "disk_usage": (85, 95)}
+        self.calls = 0
+        self.prompt_chars = 0
+    
+    def generate_content(self, prompt):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        
+        # Metrik adalah objek JSON pertama di dalam prompt
+        metrics, _ = json.JSONDecoder().raw_decode(prompt, prompt.find('{'))
+        
+        issues = []
+        recommendations = []
+        for metric_name, (warning, critical) in self.thresholds.items():
+            value = metrics.get(metric_name)
+            if value is None or value < warning:
+                continue
+            component = self.COMPONENTS.get(metric_name, metric_name)
+            severity = "high" if value >= critical else "medium"
+            issues.append({
+                "component": component,
+                "severity": severity,
+                "description": f"{metric_name} {value:.1f}"
+            })
+            if severity == "high" and component in ["cpu", "memory"]:
+                recommendations.append({
+                    "action": "restart_service",
+                    "description": f"Restart layanan dengan penggunaan {component} tertinggi",
+                    "ansible_task": ""
+                })
         
+        status = ("critical" if any(i["severity"] == "high" for i in issues)
+                  else "warning" if issues else "healthy")
+        result = {
+            "status": status,
+            "analysis": f"Replay: {len(issues)} masalah terdeteksi",
+            "issues": issues,
+            "recommendations": recommendations
+        }
+        return type("ReplayResponse", (), {"text": json.dumps(result)})()
+
+def replay(samples, config=None):
+    """Menjalankan analisis, keputusan remediasi (dry-run) dan format notifikasi atas riwayat metrik"""
+    config = config or {}
+    model = ReplayModel(config.get("thresholds"))
+    cache_precision = config.get("cache_precision")
+    cache_size = config.get("cache_size", REPLAY_CACHE_SIZE)
+    cache = {}
+    
+    # Policy dan riwayat remediasi terisolasi dari produksi agar hasil replay bisa direproduksi
+    policy = remediation_policy(config.get("policy"))
+    history = json.loads(json.dumps(config.get("history", {})))
+    
+    # Replay menghasilkan ribuan siklus, hanya log error yang ditulis
+    logger = logging.getLogger()
+    saved_level = logger.level
+    logger.setLevel(logging.ERROR)
+    
+    counts = {"cycles": 0, "llm_calls": 0, "cache_hits": 0, "alerts": 0, "status": {}, "decisions": {}}
+    recent_decisions = deque(maxlen=REPLAY_RECENT_DECISIONS)
+    started = time.monotonic()
+    try:
+        for sample in samples:
+            counts["cycles"] += 1
+            host = sample.host
+            
+            key = None
+            if cache_precision is not None:
+                key = tuple(None if math.isnan(value) else round(value, cache_precision) for value in sample.values)
+            analysis = cache.get(key) if key is not None else None
+            
+            if analysis is None:
+                analysis = analyze_with_gemini(sample.to_metrics(), model=model)
+                if key is not None:
+                    if len(cache) >= cache_size:
+                        del cache[next(iter(cache))]
+                    cache[key] = analysis
+            else:
+                counts["cache_hits"] += 1
+            
+            counts["status"][analysis.status] = counts["status"].get(analysis.status, 0) + 1
+            
+            execution_results = run_remediations(plan_remediations(analysis, resolve_targets=False), dry_run=True,
+                                                 history=history, policy=policy)
+            for entry in execution_results:
+                decision = f"{entry['action']}:{entry['result']['status']}"
+                counts["decisions"][decision] = counts["decisions"].get(decision, 0) + 1
+                recent_decisions.append(ActionResult.from_entry(entry, host, sample.timestamp))
+            
+            if should_notify(analysis, execution_results):
+                format_notification_message(analysis, execution_results or None, host=(host, host))
+                counts["alerts"] += 1
+    finally:
+        logger.setLevel(saved_level)
+    
+    counts["llm_calls"] = model.calls
+    counts["prompt_chars"] = model.prompt_chars
+    counts["recent_decisions"] = [decision.to_dict() for decision in recent_decisions]
+    counts["elapsed"] = round(time.monotonic() - started, 2)
+    return counts
+
+def cmd_collect(args):
+    """Subcommand collect: ambil metrik dari Prometheus dan cetak sebagai JSON"""
+    metrics = get_prometheus_metrics()
+    if not metrics:
+        logging.error("Gagal mendapatkan metrik.")
+        return 1
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(metrics, f, indent=2)
+        logging.info(f"Metrik disimpan di {args.output}")
+    else:
+        print(json.dumps(metrics, indent=2))
+    return 0
+
+def cmd_analyze(args):
+    """Subcommand analyze: analisis metrik (dari file atau Prometheus) dengan Gemini tanpa remediasi"""
+    if args.metrics:
+        with open(args.metrics, "r") as f:
+            metrics = json.load(f)
+    else:
+        metrics = get_prometheus_metrics()
+    if not metrics:
+        logging.error("Gagal mendapatkan metrik.")
+        return 1
+    
+    analysis = analyze_with_gemini(metrics).to_dict()
+    report_file = save_report(analysis)
+    logging.info(f"Laporan analisis disimpan di {report_file}")
+    print(json.dumps(analysis, indent=2))
+    return 0
+
+def cmd_remediate(args):
+    """Subcommand remediate: workflow lengkap (metrik, analisis, remediasi, notifikasi)"""
+    return main(dry_run=getattr(args, "dry_run", False))
+
+def cmd_summary(args):
+    """Subcommand summary: kirim ringkasan harian dari agregat berjalan"""
+    result = send_daily_summary()
+    return 0 if result.get("status") == "success" else 1
+
+def cmd_record(args):
+    """Subcommand record: rekam riwayat metrik dari Prometheus untuk replay"""
+    if not args.output.endswith(".jsonl"):
+        logging.error("Output record harus berupa file .jsonl")
+        return 1
+    
+    end = time.time()
+    written = record_prometheus_history(args.output, end - args.hours * 3600, end, args.step)
+    logging.info(f"Riwayat metrik {args.hours} jam ({written} snapshot) disimpan di {args.output}")
+    return 0
+
+def cmd_replay(args):
+    """Subcommand replay: bandingkan konfigurasi atas riwayat metrik terekam"""
+    configs = []
+    for config_file in args.config or [None]:
+        if config_file:
+            with open(config_file, "r") as f:
+                configs.append((config_file, json.load(f)))
+        else:
+            configs.append(("default", {}))
+    
+    reports = {}
+    for name, config in configs:
+        reports[name] = replay(load_replay_samples(args.samples), config)
+        counts = reports[name]
+        decisions = sum(counts["decisions"].values())
+        print(f"{name}: {counts['cycles']} siklus, {decisions} keputusan, {counts['llm_calls']} panggilan LLM "
+              f"({counts['cache_hits']} cache hit), {counts['alerts']} alert, {counts['elapsed']} detik")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+def build_parser():
+    """Membuat parser CLI dengan subcommand untuk masing-masing job cron"""
+    parser = argparse.ArgumentParser(description="GeminiServerGuard - monitoring dan remediasi server dengan Gemini AI")
+    parser.add_argument("--daily-summary", action="store_true",
+                        help="Alias lama untuk subcommand summary")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    collect = subparsers.add_parser("collect", help="Ambil metrik dari Prometheus")
+    collect.add_argument("-o", "--output", help="Simpan metrik ke file JSON alih-alih stdout")
+    collect.set_defaults(func=cmd_collect)
+    
+    analyze = subparsers.add_parser("analyze", help="Analisis metrik dengan Gemini tanpa remediasi")
+    analyze.add_argument("-m", "--metrics", help="File JSON metrik (default: ambil dari Prometheus)")
+    analyze.set_defaults(func=cmd_analyze)
+    
+    remediate = subparsers.add_parser("remediate", help="Jalankan workflow lengkap termasuk remediasi")
+    remediate.add_argument("--dry-run", action="store_true", help="Tentukan tindakan tanpa menjalankannya")
+    remediate.set_defaults(func=cmd_remediate)
+    
+    summary = subparsers.add_parser("summary", help="Kirim ringkasan harian ke Telegram")
+    summary.set_defaults(func=cmd_summary)
+    
+    record = subparsers.add_parser("record", help="Rekam riwayat metrik Prometheus untuk replay")
+    record.add_argument("-o", "--output", required=True, help="File JSONL tujuan (satu snapshot per baris)")
+    record.add_argument("--hours", type=float, default=24, help="Rentang waktu ke belakang (jam)")
+    record.add_argument("--step", type=int, default=60, help="Resolusi sampel (detik)")
+    record.set_defaults(func=cmd_record)
+    
+    replay_parser = subparsers.add_parser("replay", help="Simulasi keputusan atas riwayat metrik terekam")
+    replay_parser.add_argument("samples", help="Hasil `record` (.jsonl) atau snapshot metrik (.json)")
+    replay_parser.add_argument("-c", "--config", action="append",
+                               help="File JSON konfigurasi (thresholds, cache_precision, policy, history); bisa diulang")
+    replay_parser.add_argument("-o", "--output", help="Simpan laporan lengkap ke file JSON")
+    replay_parser.set_defaults(func=cmd_replay)
+    
+    return parser
+
+def cli(argv=None):
+    """Entry point CLI; tanpa subcommand menjalankan workflow lengkap seperti sebelumnya"""
+    args = build_parser().parse_args(argv)
+    
+    if args.daily_summary:
+        return cmd_summary(args)
+    if args.command is None:
+        return cmd_remediate(args)
+    return args.func(args)
+
 if __name__ == "__main__":
-    main()
+    sys.exit(cli())